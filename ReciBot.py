@@ -21,6 +21,8 @@ import matplotlib.pyplot as plt   # Generación de gráficos y visualizaciones e
 import streamlit_survey as ss     # (Opcional) Soporte para encuestas y formularios avanzados dentro de Streamlit
 from datetime import datetime, timedelta, date  # Gestión y manipulación precisa de fechas y tiempos
 import numpy as np                # Operaciones numéricas, manejo de arreglos y soporte para cálculos estadísticos y gráficos
+import estadisticas_aproximadas as ea  # Resúmenes de memoria constante (usuarios distintos, cuantiles, principales contribuyentes)
+import tendencias                 # Series de kg por tipo de residuo a lo largo del tiempo, en caché
 
 
 #----------------------------------------------------------------------------------------------------------------------------------------
@@ -104,34 +106,52 @@ def guardar_datos_en_csv(datos: dict, bolsas: dict,
                          semanal: dict, mensual: dict, anual: dict,
                          ruta_csv: str = "datos_basura.csv") -> pd.DataFrame:
     """
-    Guarda un nuevo registro consolidado en un archivo CSV. Si el archivo existe, añade la nueva fila; 
-    si no, crea el archivo con los datos iniciales.
+    Guarda un nuevo registro consolidado en un archivo CSV. Si el archivo existe, añade la nueva fila
+    al final sin leer el historial completo; si no, crea el archivo con los datos iniciales. Además de
+    los acumulados, guarda los kg ingresados por tipo (columnas Kg_<tipo>) y actualiza el resumen de
+    estadísticas aproximadas asociado al CSV.
 
     Parámetros:
-    - datos (dict): Diccionario con datos del usuario y fecha.
+    - datos (dict): Diccionario con datos del usuario, fecha y kg por tipo de residuo.
     - bolsas, semanal, mensual, anual (dict): Diccionarios con acumulados calculados de basura.
     - ruta_csv (str): Ruta o nombre del archivo CSV donde se guardan los datos.
 
     Retorna:
-    - pd.DataFrame: DataFrame actualizado con todos los registros almacenados.
+    - pd.DataFrame: DataFrame con la fila guardada.
     """
     fila = {
         "Usuario": datos["usuario"],
         "Fecha": datos["fecha"],
+        **{f"Kg_{k}": datos.get(k, 0.0) for k in ea.TIPOS},
         **{f"Bolsas_{k}": v for k, v in bolsas.items()},
         **{f"Semanal_{k}": v for k, v in semanal.items()},
         **{f"Mensual_{k}": v for k, v in mensual.items()},
         **{f"Anual_{k}": v for k, v in anual.items()}
     }
+    df_fila = pd.DataFrame([fila])
+
+    # El candado evita que dos sesiones escriban el CSV y el resumen al mismo tiempo
+    with ea.CANDADO_ESCRITURA:
+        version_previa = ea.version_csv(ruta_csv)
+        columnas = []
+        if version_previa is not None and version_previa[1] > 0:
+            columnas = pd.read_csv(ruta_csv, nrows=0).columns.tolist()
+
+        if columnas and set(fila) <= set(columnas):
+            # Mismo esquema: se añade la fila al final respetando el orden de columnas del archivo
+            df_fila.reindex(columns=columnas).to_csv(ruta_csv, mode="a", header=False, index=False)
+        elif columnas:
+            # Esquema anterior (p. ej. sin columnas Kg_): se reescribe una sola vez con las columnas nuevas
+            df_existente = pd.read_csv(ruta_csv)
+            pd.concat([df_existente, df_fila], ignore_index=True).to_csv(ruta_csv, index=False)
+        else:
+            df_fila.to_csv(ruta_csv, index=False)
 
-    if os.path.exists(ruta_csv):
-        df_existente = pd.read_csv(ruta_csv)
-        df_nuevo = pd.concat([df_existente, pd.DataFrame([fila])], ignore_index=True)
-    else:
-        df_nuevo = pd.DataFrame([fila])
-
-    df_nuevo.to_csv(ruta_csv, index=False)
-    return df_nuevo
+        # Actualiza incrementalmente el resumen aproximado con los kg originales del registro
+        ea.actualizar_resumen(ruta_csv, datos["usuario"],
+                              {tipo: datos.get(tipo, 0.0) for tipo in ea.TIPOS},
+                              version_previa)
+    return df_fila
 
 # ----------------------Función 4: carga de datos desde archivo CSV-------------------------------------------------------------
 def cargar_datos_csv(ruta_csv: str) -> pd.DataFrame:
@@ -221,6 +241,8 @@ def obtener_figura_temporal(df: pd.DataFrame, periodo: str) -> plt.Figure | None
         return None
 
     totales = df[columnas].sum()
+    if totales.sum() == 0:
+        return None  # Registros de otros periodos: no hay nada que repartir
 
     fig, ax = plt.subplots()
     totales.plot(kind='pie', autopct='%1.1f%%', ax=ax)
@@ -273,6 +295,29 @@ def grafica_barras_agrupadas_por_usuario(df: pd.DataFrame) -> plt.Figure:
     plt.tight_layout()
     return fig
 
+# ----------------------Función 10: para visualización gráfica usando matplotlib---------------------------------------------------------
+def obtener_figura_tendencia(series: pd.DataFrame, granularidad: str) -> plt.Figure:
+    """
+    Genera un gráfico de líneas con la evolución de kg por tipo de residuo.
+
+    Parámetros:
+    - series (pd.DataFrame): Series de tiempo por tipo de residuo.
+    - granularidad (str): Granularidad usada, para el título del gráfico.
+
+    Retorna:
+    - matplotlib.figure.Figure: Figura con el gráfico de líneas.
+    """
+    fig, ax = plt.subplots(figsize=(12, 6))
+    series.plot(ax=ax, linewidth=1.5)
+    ax.set_ylabel("Kilogramos")
+    ax.set_xlabel("Fecha")
+    ax.set_title(f"Tendencia {granularidad.lower()} de basura por tipo")
+    ax.legend(title="Tipo de basura")
+    ax.grid(linestyle='--', alpha=0.6)
+
+    plt.tight_layout()
+    return fig
+
 
 #---------------------------------------------------------------------------------------------------------------------------
 #-----------------------------------------Aqui empieza el código de la interfaz---------------------------------------------
@@ -636,63 +681,108 @@ elif seccion == "mostrar basura":
 
     # Definir ruta del archivo CSV donde se almacenan los datos
     ruta_csv = "datos_basura.csv"
+    usuario_filtro = ""  # Sin filtro (toda la comunidad) salvo que se elija un usuario abajo
+
+    # Por encima de este tamaño (bytes) el historial no se carga completo en memoria
+    tamano_maximo_exacto = 50 * 1024 * 1024
+    historial_grande = os.path.exists(ruta_csv) and os.path.getsize(ruta_csv) > tamano_maximo_exacto
+    if historial_grande:
+        st.info("ℹ️ El historial es demasiado grande para cargarlo completo; se muestran estadísticas aproximadas.")
+
+    # Cifras principales calculadas con resúmenes de memoria constante. En este modo no se carga
+    # el CSV completo ni se prepara su descarga, así la memoria no crece con el historial
+    modo_aproximado = historial_grande or (
+        os.path.exists(ruta_csv) and st.checkbox("⚡ Mostrar estadísticas aproximadas del historial completo")
+    )
+    if modo_aproximado:
+        resumen = ea.cargar_resumen(ruta_csv)
+        st.markdown("### ⚡ Estadísticas aproximadas")
+        st.caption("Calculadas con resúmenes de memoria constante; los valores tienen un error pequeño y acotado.")
 
-    # Cargar los datos existentes en un DataFrame
-    df = cargar_datos_csv(ruta_csv)
+        col1, col2 = st.columns(2)
+        col1.metric("Registros", resumen.registros)
+        col2.metric("Usuarios distintos (≈)", resumen.usuarios.estimar())
 
-    # Convertir todo el DataFrame a CSV
-    csv_completo = df.to_csv(index=False).encode('utf-8')
+        cuantiles = {f"p{int(q * 100)}": resumen.kg_por_registro.cuantil(q) for q in [0.25, 0.5, 0.75, 0.9, 0.99]}
+        st.markdown("#### ⚖️ Kg por registro (cuantiles ≈)")
+        st.dataframe(pd.DataFrame([cuantiles], index=["kg"]))
 
-        # Botón para descargar el archivo CSV completo
-    st.download_button(
-        label="📥 Descargar todos los datos en CSV",
-        data=csv_completo,
-        file_name='datos_basura_completo.csv',
-        mime='text/csv'
-        )
+        st.markdown("#### 🏆 Principales contribuyentes por tipo de residuo (≈)")
+        tipo_residuo = st.selectbox("Tipo de residuo", options=ea.TIPOS)
+        principales = resumen.principales_por_tipo[tipo_residuo].principales(5)
+        st.dataframe(pd.DataFrame(principales, columns=["Usuario", "Kg (≈)", "Error máximo (kg)"]))
 
-    # Validar si existen datos para mostrar
-    if df.empty:
-        st.warning("⚠️ Aún no hay datos almacenados.")
     else:
-        # Obtener lista ordenada de usuarios y fechas para filtros
-        usuarios = sorted(df["Usuario"].unique())
-        fechas = sorted(df["Fecha"].unique())
-
-        # Selector para filtrar por usuario
-        usuario_filtro = st.selectbox("🔍 Buscar por usuario", options=[""] + usuarios)
-
-        # Selector para filtrar por fecha
-        fecha_filtro = st.selectbox("📅 Buscar por fecha", options=[""] + fechas)
-
-        # Aplicar filtros seleccionados para obtener subconjunto de datos
-        df_filtrado = filtrar_datos(df, usuario_filtro, fecha_filtro)
+        # Cargar los datos existentes en un DataFrame
+        df = cargar_datos_csv(ruta_csv)
+
+        # Convertir todo el DataFrame a CSV
+        csv_completo = df.to_csv(index=False).encode('utf-8')
+
+            # Botón para descargar el archivo CSV completo
+        st.download_button(
+            label="📥 Descargar todos los datos en CSV",
+            data=csv_completo,
+            file_name='datos_basura_completo.csv',
+            mime='text/csv'
+            )
 
-        # Validar si el filtro generó datos para mostrar
-        if df_filtrado.empty:
-            st.info("No se encontraron registros con esos filtros.")
+        # Validar si existen datos para mostrar
+        if df.empty:
+            st.warning("⚠️ Aún no hay datos almacenados.")
+        else:
+            # Obtener lista ordenada de usuarios y fechas para filtros
+            usuarios = sorted(df["Usuario"].unique())
+            fechas = sorted(df["Fecha"].unique())
+
+            # Selector para filtrar por usuario
+            usuario_filtro = st.selectbox("🔍 Buscar por usuario", options=[""] + usuarios)
+
+            # Selector para filtrar por fecha
+            fecha_filtro = st.selectbox("📅 Buscar por fecha", options=[""] + fechas)
+
+            # Aplicar filtros seleccionados para obtener subconjunto de datos
+            df_filtrado = filtrar_datos(df, usuario_filtro, fecha_filtro)
+
+            # Validar si el filtro generó datos para mostrar
+            if df_filtrado.empty:
+                st.info("No se encontraron registros con esos filtros.")
+            else:
+                # Mostrar tabla con datos filtrados
+                tabla = obtener_tabla_filtrada(df_filtrado)
+                st.markdown("### 📋 Datos filtrados:")
+                st.dataframe(tabla)
+
+                # Generar y mostrar gráfica de barras con cantidad de bolsas por tipo de basura
+                figura_bolsas = obtener_figura_bolsas(df_filtrado)
+                st.markdown("### 🛍️ Cantidad de bolsas por tipo de basura")
+                st.pyplot(figura_bolsas)
+
+                # Mostrar gráficos circulares para distribución de basura en períodos: semanal, mensual y anual
+                for periodo in ["Semanal", "Mensual", "Anual"]:
+                    figura_temporal = obtener_figura_temporal(df_filtrado, periodo)
+                    if figura_temporal:
+                        st.markdown(f"### 📈 Distribución de basura {periodo.lower()}")
+                        st.pyplot(figura_temporal)
+
+            # Gráfica comparativa de barras agrupadas por usuario y tipo de basura
+            fig = grafica_barras_agrupadas_por_usuario(df)
+            st.markdown("### 👥 Comparación entre usuarios")
+            st.pyplot(fig)
+
+    # Tendencia en el tiempo por tipo de residuo. Solo depende del filtro de usuario y lee el CSV
+    # por bloques, así se muestra también en el modo aproximado y con filtros sin resultados
+    version_datos = ea.version_csv(ruta_csv)
+    if version_datos is not None:
+        st.markdown("### 📉 Tendencia en el tiempo")
+        granularidad = st.radio("Granularidad", options=list(tendencias.REGLAS_REMUESTREO), index=1, horizontal=True)
+        series = tendencias.obtener_series_tendencia_cacheadas(
+            ruta_csv, usuario_filtro, granularidad, tuple(version_datos)
+        )
+        if series.empty:
+            st.info("No hay datos suficientes para mostrar la tendencia.")
         else:
-            # Mostrar tabla con datos filtrados
-            tabla = obtener_tabla_filtrada(df_filtrado)
-            st.markdown("### 📋 Datos filtrados:")
-            st.dataframe(tabla)
-
-            # Generar y mostrar gráfica de barras con cantidad de bolsas por tipo de basura
-            figura_bolsas = obtener_figura_bolsas(df_filtrado)
-            st.markdown("### 🛍️ Cantidad de bolsas por tipo de basura")
-            st.pyplot(figura_bolsas)
-
-            # Mostrar gráficos circulares para distribución de basura en períodos: semanal, mensual y anual
-            for periodo in ["Semanal", "Mensual", "Anual"]:
-                figura_temporal = obtener_figura_temporal(df_filtrado, periodo)
-                if figura_temporal:
-                    st.markdown(f"### 📈 Distribución de basura {periodo.lower()}")
-                    st.pyplot(figura_temporal)
-
-        # Gráfica comparativa de barras agrupadas por usuario y tipo de basura
-        fig = grafica_barras_agrupadas_por_usuario(df)
-        st.markdown("### 👥 Comparación entre usuarios")
-        st.pyplot(fig)
+            st.pyplot(obtener_figura_tendencia(series, granularidad))
 
 
 # Pie de página con información de autoría y fecha de actualización
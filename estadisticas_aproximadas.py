@@ -0,0 +1,490 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# Descripción: Estadísticas aproximadas de ReciBot con resúmenes (sketches) combinables
+#----------------------------------------------------------------------------------------------------------------------------------------
+"""
+Resúmenes de memoria constante para las cifras principales del historial de basura:
+
+- Usuarios distintos (HyperLogLog, error relativo típico ~1.6 % con precisión 12).
+- Cuantiles de kg por registro (KLL, error de rango ~1 % con k=200).
+- Principales usuarios por tipo de residuo según kg aportados (Space-Saving, error <= total/k).
+
+El resumen se construye en una sola pasada por bloques sobre el CSV y se guarda en un JSON junto
+a él. guardar_datos_en_csv lo actualiza en cada registro nuevo, así el panel no necesita cargar
+todo el DataFrame para mostrar estas cifras. Si el JSON falta, está dañado o no corresponde al
+CSV actual, se reconstruye en la siguiente consulta.
+"""
+
+import hashlib                    # Hash estable entre ejecuciones para HyperLogLog
+import heapq                      # Mínimo de Space-Saving sin recorrer todos los contadores
+import json                       # Persistencia del resumen en disco
+import math                       # Cálculos de capacidad y estimación
+import os                         # Rutas y fechas de modificación de archivos
+import random                     # Compactación aleatoria del sketch de cuantiles
+import tempfile                   # Escritura atómica del resumen
+import threading                  # Exclusión mutua entre sesiones que guardan registros
+
+import pandas as pd               # Lectura del CSV por bloques
+
+
+TIPOS = ["organico", "plastico", "papel", "vidrio", "metal", "no_reciclable"]
+
+# Streamlit atiende todas las sesiones en hilos de un mismo proceso; este candado serializa la
+# escritura del CSV y del resumen (ReciBot.py se vuelve a ejecutar en cada rerun, por eso vive aquí)
+CANDADO_ESCRITURA = threading.Lock()
+
+# Serializa las reconstrucciones completas sin bloquear a quien guarda registros
+_CANDADO_RECONSTRUCCION = threading.Lock()
+
+
+#----------------------------------------------------------------------------------------------------------------------------------------
+#-----------------------------------------------------------Sketches------------------------------------------------------------------
+#----------------------------------------------------------------------------------------------------------------------------------------
+
+class ConteoDistintos:
+    """
+    HyperLogLog: estima cuántos valores distintos se han visto usando 2**precision registros.
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registros = [0] * (1 << precision)
+
+    def agregar(self, valor: str) -> None:
+        h = int.from_bytes(hashlib.blake2b(str(valor).encode("utf-8"), digest_size=8).digest(), "big")
+        indice = h >> (64 - self.precision)
+        resto = h & ((1 << (64 - self.precision)) - 1)
+        rango = (64 - self.precision) - resto.bit_length() + 1
+        if rango > self.registros[indice]:
+            self.registros[indice] = rango
+
+    def combinar(self, otro: "ConteoDistintos") -> None:
+        self.registros = [max(a, b) for a, b in zip(self.registros, otro.registros)]
+
+    def estimar(self) -> int:
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / sum(2.0 ** -r for r in self.registros)
+        vacios = self.registros.count(0)
+        # Corrección para cardinalidades pequeñas (conteo lineal)
+        if estimacion <= 2.5 * m and vacios:
+            estimacion = m * math.log(m / vacios)
+        return round(estimacion)
+
+    def a_dict(self) -> dict:
+        return {"precision": self.precision, "registros": self.registros}
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "ConteoDistintos":
+        sketch = cls(datos["precision"])
+        sketch.registros = list(datos["registros"])
+        return sketch
+
+
+class CuantilesKLL:
+    """
+    Sketch KLL: conserva una muestra ponderada por niveles para responder cuantiles con error acotado.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3):
+        self.k = k
+        self.c = c
+        self.niveles = [[]]
+        self.tamano = 0
+        self.tamano_maximo = self._capacidad(0)
+        self.conteo = 0
+        self._rng = random.Random()
+
+    def _capacidad(self, nivel: int) -> int:
+        altura = len(self.niveles)
+        return int(math.ceil(self.k * self.c ** (altura - nivel - 1))) + 1
+
+    def _crecer(self) -> None:
+        self.niveles.append([])
+        self.tamano_maximo = sum(self._capacidad(h) for h in range(len(self.niveles)))
+
+    def _comprimir(self) -> None:
+        for h in range(len(self.niveles)):
+            if len(self.niveles[h]) >= self._capacidad(h):
+                if h + 1 >= len(self.niveles):
+                    self._crecer()
+                nivel = sorted(self.niveles[h])
+                inicio = self._rng.randint(0, 1)
+                self.niveles[h + 1].extend(nivel[inicio::2])
+                self.niveles[h] = []
+                self.tamano = sum(len(n) for n in self.niveles)
+                if self.tamano < self.tamano_maximo:
+                    break
+
+    def agregar(self, valor: float) -> None:
+        self.niveles[0].append(float(valor))
+        self.tamano += 1
+        self.conteo += 1
+        if self.tamano >= self.tamano_maximo:
+            self._comprimir()
+
+    def combinar(self, otro: "CuantilesKLL") -> None:
+        while len(self.niveles) < len(otro.niveles):
+            self._crecer()
+        for h, nivel in enumerate(otro.niveles):
+            self.niveles[h].extend(nivel)
+        self.conteo += otro.conteo
+        self.tamano = sum(len(n) for n in self.niveles)
+        while self.tamano >= self.tamano_maximo:
+            self._comprimir()
+
+    def cuantil(self, q: float) -> float | None:
+        ponderados = sorted((valor, 2 ** h) for h, nivel in enumerate(self.niveles) for valor in nivel)
+        if not ponderados:
+            return None
+        total = sum(peso for _, peso in ponderados)
+        acumulado = 0
+        for valor, peso in ponderados:
+            acumulado += peso
+            if acumulado >= q * total:
+                return valor
+        return ponderados[-1][0]
+
+    def a_dict(self) -> dict:
+        return {"k": self.k, "c": self.c, "niveles": self.niveles, "conteo": self.conteo}
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "CuantilesKLL":
+        sketch = cls(datos["k"], datos["c"])
+        sketch.niveles = [list(n) for n in datos["niveles"]]
+        sketch.conteo = datos["conteo"]
+        sketch.tamano = sum(len(n) for n in sketch.niveles)
+        sketch.tamano_maximo = sum(sketch._capacidad(h) for h in range(len(sketch.niveles)))
+        return sketch
+
+
+class PrincipalesContribuyentes:
+    """
+    Space-Saving ponderado: mantiene a lo sumo k contadores con los elementos de mayor peso.
+    Cada contador guarda [peso estimado, error máximo]; el peso real está entre ambos extremos.
+
+    El menor contador se obtiene de un montículo con borrado perezoso: cada cambio de peso añade
+    una entrada nueva y las entradas viejas se descartan al llegar a la cima.
+    """
+
+    def __init__(self, k: int = 100):
+        self.k = k
+        self.contadores = {}
+        self._monticulo = []
+
+    def _reconstruir_monticulo(self) -> None:
+        self._monticulo = [(peso, elemento) for elemento, (peso, _) in self.contadores.items()]
+        heapq.heapify(self._monticulo)
+
+    def _sacar_minimo(self) -> tuple:
+        """
+        Quita del resumen el elemento con menor peso y retorna (peso, elemento).
+        """
+        while True:
+            peso, elemento = heapq.heappop(self._monticulo)
+            contador = self.contadores.get(elemento)
+            if contador is not None and contador[0] == peso:
+                del self.contadores[elemento]
+                return peso, elemento
+
+    def agregar(self, elemento: str, peso: float) -> None:
+        if peso <= 0:
+            return
+        if elemento in self.contadores:
+            self.contadores[elemento][0] += peso
+        elif len(self.contadores) < self.k:
+            self.contadores[elemento] = [peso, 0.0]
+        else:
+            peso_minimo, _ = self._sacar_minimo()
+            self.contadores[elemento] = [peso_minimo + peso, peso_minimo]
+        heapq.heappush(self._monticulo, (self.contadores[elemento][0], elemento))
+        # Las entradas viejas se acumulan; se compacta cuando superan varias veces a los contadores
+        if len(self._monticulo) > 4 * self.k:
+            self._reconstruir_monticulo()
+
+    def _minimo(self) -> float:
+        """
+        Peso máximo que pudo tener un elemento no monitoreado: el menor contador si el resumen
+        está lleno, o 0 si todavía hay espacio (entonces todo elemento visto tiene contador).
+        """
+        if len(self.contadores) < self.k:
+            return 0.0
+        return min(peso for peso, _ in self.contadores.values())
+
+    def combinar(self, otro: "PrincipalesContribuyentes") -> None:
+        # A un elemento ausente de un resumen se le suma el mínimo de ese resumen, tanto al peso
+        # como al error, para que el peso real siga dentro de [peso - error, peso]
+        minimo_propio, minimo_otro = self._minimo(), otro._minimo()
+        combinados = {}
+        for elemento in set(self.contadores) | set(otro.contadores):
+            peso_a, error_a = self.contadores.get(elemento, (minimo_propio, minimo_propio))
+            peso_b, error_b = otro.contadores.get(elemento, (minimo_otro, minimo_otro))
+            combinados[elemento] = [peso_a + peso_b, error_a + error_b]
+        self.contadores = combinados
+        mayores = sorted(self.contadores.items(), key=lambda par: par[1][0], reverse=True)[:self.k]
+        self.contadores = dict(mayores)
+        self._reconstruir_monticulo()
+
+    def principales(self, n: int = 5) -> list:
+        """
+        Retorna:
+        - List[tuple]: (elemento, peso estimado, error máximo) ordenados de mayor a menor peso.
+        """
+        mayores = sorted(self.contadores.items(), key=lambda par: par[1][0], reverse=True)[:n]
+        return [(elemento, round(peso, 2), round(error, 2)) for elemento, (peso, error) in mayores]
+
+    def a_dict(self) -> dict:
+        return {"k": self.k, "contadores": self.contadores}
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "PrincipalesContribuyentes":
+        sketch = cls(datos["k"])
+        sketch.contadores = {e: list(v) for e, v in datos["contadores"].items()}
+        sketch._reconstruir_monticulo()
+        return sketch
+
+
+#----------------------------------------------------------------------------------------------------------------------------------------
+#--------------------------------------------------Resumen completo del historial-------------------------------------------------------
+#----------------------------------------------------------------------------------------------------------------------------------------
+
+class ResumenEstadistico:
+    """
+    Agrupa los tres sketches y el número de registros procesados.
+    """
+
+    def __init__(self):
+        self.registros = 0
+        self.usuarios = ConteoDistintos()
+        self.kg_por_registro = CuantilesKLL()
+        self.principales_por_tipo = {tipo: PrincipalesContribuyentes() for tipo in TIPOS}
+
+    def agregar_registro(self, usuario: str, kg_por_tipo: dict) -> None:
+        """
+        Incorpora un registro al resumen.
+
+        Parámetros:
+        - usuario (str): Nombre del usuario que hizo el registro.
+        - kg_por_tipo (dict): Kilogramos por tipo de residuo (claves de TIPOS).
+        """
+        self.registros += 1
+        self.usuarios.agregar(usuario)
+        self.kg_por_registro.agregar(sum(kg_por_tipo.get(tipo, 0.0) for tipo in TIPOS))
+        for tipo in TIPOS:
+            self.principales_por_tipo[tipo].agregar(usuario, kg_por_tipo.get(tipo, 0.0))
+
+    def agregar_bloque(self, usuarios: pd.Series, kg: pd.DataFrame) -> None:
+        """
+        Incorpora varios registros a la vez. Cada usuario distinto se procesa una sola vez por bloque
+        y sus kg se suman antes de pasar a Space-Saving (las cotas ponderadas siguen valiendo).
+
+        Parámetros:
+        - usuarios (pd.Series): Usuario de cada registro.
+        - kg (pd.DataFrame): Kg por tipo de cada registro (ver kg_de_registros), mismo índice.
+        """
+        self.registros += len(usuarios)
+        for usuario in usuarios.unique():
+            self.usuarios.agregar(usuario)
+        for total in kg[TIPOS].sum(axis=1).tolist():
+            self.kg_por_registro.agregar(total)
+        por_usuario = kg[TIPOS].groupby(usuarios.to_numpy()).sum()
+        for tipo in TIPOS:
+            sketch = self.principales_por_tipo[tipo]
+            for usuario, peso in por_usuario[tipo].items():
+                sketch.agregar(usuario, peso)
+
+    def combinar(self, otro: "ResumenEstadistico") -> None:
+        self.registros += otro.registros
+        self.usuarios.combinar(otro.usuarios)
+        self.kg_por_registro.combinar(otro.kg_por_registro)
+        for tipo in TIPOS:
+            self.principales_por_tipo[tipo].combinar(otro.principales_por_tipo[tipo])
+
+    def a_dict(self) -> dict:
+        return {
+            "registros": self.registros,
+            "usuarios": self.usuarios.a_dict(),
+            "kg_por_registro": self.kg_por_registro.a_dict(),
+            "principales_por_tipo": {t: s.a_dict() for t, s in self.principales_por_tipo.items()},
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "ResumenEstadistico":
+        resumen = cls()
+        resumen.registros = datos["registros"]
+        resumen.usuarios = ConteoDistintos.desde_dict(datos["usuarios"])
+        resumen.kg_por_registro = CuantilesKLL.desde_dict(datos["kg_por_registro"])
+        resumen.principales_por_tipo = {
+            t: PrincipalesContribuyentes.desde_dict(s) for t, s in datos["principales_por_tipo"].items()
+        }
+        return resumen
+
+
+# -------------------------Función 1: kilogramos de un registro almacenado--------------------------------------------------------------
+def kg_de_registros(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Recupera los kg por tipo de cada fila del CSV desde las columnas Kg_<tipo> que escribe
+    guardar_datos_en_csv. Las filas anteriores a esas columnas solo tienen los acumulados
+    Semanal/Mensual/Anual del registro, que valen los kg ingresados o 0 según si la fecha caía en
+    el periodo; para ellas se usa el máximo de los tres (0 si la fecha no caía en ninguno).
+
+    Parámetros:
+    - df (pd.DataFrame): Filas con el esquema de guardar_datos_en_csv.
+
+    Retorna:
+    - pd.DataFrame: Una columna por tipo de residuo con los kg del registro.
+    """
+    kg = pd.DataFrame(index=df.index)
+    for tipo in TIPOS:
+        periodos = [f"{periodo}_{tipo}" for periodo in ("Semanal", "Mensual", "Anual")
+                    if f"{periodo}_{tipo}" in df.columns]
+        legado = df[periodos].max(axis=1) if periodos else pd.Series(0.0, index=df.index)
+        if f"Kg_{tipo}" in df.columns:
+            kg[tipo] = df[f"Kg_{tipo}"].fillna(legado).fillna(0.0)
+        else:
+            kg[tipo] = legado.fillna(0.0)
+    return kg
+
+
+# -------------------------Función 2: rutas y versión del CSV----------------------------------------------------------------------------
+def ruta_resumen(ruta_csv: str) -> str:
+    """
+    Retorna la ruta del archivo JSON donde se guarda el resumen de un CSV (p. ej. datos_basura_resumen.json).
+    """
+    return os.path.splitext(ruta_csv)[0] + "_resumen.json"
+
+
+def version_csv(ruta_csv: str) -> list | None:
+    """
+    Retorna [fecha de modificación en ns, tamaño en bytes] del CSV, o None si no existe.
+    Cualquier escritura cambia al menos el tamaño, aunque ocurra en el mismo instante.
+    """
+    try:
+        estado = os.stat(ruta_csv)
+    except OSError:
+        return None
+    return [estado.st_mtime_ns, estado.st_size]
+
+
+# -------------------------Función 3: construir el resumen en una pasada por bloques-----------------------------------------------------
+def construir_resumen(ruta_csv: str, filas_por_bloque: int = 50_000) -> ResumenEstadistico:
+    """
+    Recorre el CSV por bloques sin cargarlo completo en memoria y construye el resumen.
+
+    Parámetros:
+    - ruta_csv (str): Ruta del CSV con el historial.
+    - filas_por_bloque (int): Filas leídas en cada bloque.
+
+    Retorna:
+    - ResumenEstadistico: Resumen del historial completo (vacío si el CSV no existe o está vacío).
+    """
+    resumen = ResumenEstadistico()
+    if not os.path.exists(ruta_csv) or os.path.getsize(ruta_csv) == 0:
+        return resumen
+
+    for bloque in pd.read_csv(ruta_csv, chunksize=filas_por_bloque):
+        resumen.agregar_bloque(bloque["Usuario"].astype(str), kg_de_registros(bloque))
+    return resumen
+
+
+# -------------------------Función 4: leer y guardar el resumen en disco-----------------------------------------------------------------
+def guardar_resumen(resumen: ResumenEstadistico, ruta_csv: str) -> None:
+    """
+    Guarda el resumen en el JSON asociado al CSV junto con la versión del CSV que resume, para
+    detectar después si el CSV cambió sin pasar por guardar_datos_en_csv. Se escribe en un archivo
+    temporal y se reemplaza de forma atómica, así un lector nunca ve un JSON a medio escribir.
+    """
+    datos = {"version_csv": version_csv(ruta_csv), "resumen": resumen.a_dict()}
+    ruta = ruta_resumen(ruta_csv)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=os.path.dirname(ruta) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+            json.dump(datos, archivo)
+        os.replace(ruta_temporal, ruta)
+    except BaseException:
+        os.remove(ruta_temporal)
+        raise
+
+
+def _leer_resumen_guardado(ruta_csv: str) -> tuple | None:
+    """
+    Retorna (versión del CSV, resumen) guardados, o None si el JSON no existe o no se puede leer.
+    """
+    try:
+        with open(ruta_resumen(ruta_csv), encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+        return datos["version_csv"], ResumenEstadistico.desde_dict(datos["resumen"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _descartar_resumen(ruta_csv: str) -> None:
+    try:
+        os.remove(ruta_resumen(ruta_csv))
+    except OSError:
+        pass  # Ya no existe o no se puede borrar; su versión no coincidirá y se reconstruirá
+
+
+def cargar_resumen(ruta_csv: str) -> ResumenEstadistico:
+    """
+    Carga el resumen del CSV. Si no existe, está dañado o el CSV se modificó por fuera (p. ej.
+    editado a mano), lo reconstruye con una pasada completa e intenta guardarlo.
+
+    Parámetros:
+    - ruta_csv (str): Ruta del CSV con el historial.
+
+    Retorna:
+    - ResumenEstadistico: Resumen al día con el CSV.
+    """
+    if not os.path.exists(ruta_csv):
+        return ResumenEstadistico()
+
+    guardado = _leer_resumen_guardado(ruta_csv)
+    if guardado is not None and guardado[0] == version_csv(ruta_csv):
+        return guardado[1]
+
+    # Una sola reconstrucción a la vez; las sesiones que esperaban reutilizan la que acaba de terminar
+    with _CANDADO_RECONSTRUCCION:
+        guardado = _leer_resumen_guardado(ruta_csv)
+        version = version_csv(ruta_csv)
+        if guardado is not None and guardado[0] == version:
+            return guardado[1]
+
+        # Se construye sin CANDADO_ESCRITURA para no bloquear a quien guarda registros, y solo se
+        # guarda si el CSV no cambió durante la pasada
+        resumen = construir_resumen(ruta_csv)
+        with CANDADO_ESCRITURA:
+            if version_csv(ruta_csv) == version:
+                try:
+                    guardar_resumen(resumen, ruta_csv)
+                except OSError:
+                    pass  # Sin permiso de escritura: se reconstruirá en la siguiente consulta
+    return resumen
+
+
+# -------------------------Función 5: actualización incremental en cada registro nuevo---------------------------------------------------
+def actualizar_resumen(ruta_csv: str, usuario: str, kg_por_tipo: dict, version_previa: list | None) -> None:
+    """
+    Añade al resumen guardado un registro que se acaba de escribir en el CSV. Si no hay resumen,
+    no se puede leer, o no correspondía exactamente al CSV anterior a esta escritura, se descarta
+    y se reconstruirá completo la próxima vez que se consulte. Nunca lanza errores de E/S: el
+    registro ya quedó guardado en el CSV y el resumen siempre se puede reconstruir.
+
+    Debe llamarse con CANDADO_ESCRITURA tomado, junto con la escritura del CSV.
+
+    Parámetros:
+    - ruta_csv (str): Ruta del CSV al que se añadió el registro.
+    - usuario (str): Nombre del usuario.
+    - kg_por_tipo (dict): Kilogramos por tipo de residuo del registro.
+    - version_previa (list | None): version_csv del CSV justo antes de añadir el registro.
+    """
+    guardado = _leer_resumen_guardado(ruta_csv)
+    if guardado is None or guardado[0] != version_previa:
+        _descartar_resumen(ruta_csv)
+        return
+
+    resumen = guardado[1]
+    resumen.agregar_registro(usuario, kg_por_tipo)
+    try:
+        guardar_resumen(resumen, ruta_csv)
+    except OSError:
+        _descartar_resumen(ruta_csv)
@@ -0,0 +1,385 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# Descripción: Prueba de carga de ReciBot con sesiones concurrentes
+# Uso: python prueba_carga.py --sesiones 8 --iteraciones 5 --registros 5000
+#----------------------------------------------------------------------------------------------------------------------------------------
+"""
+Ejecuta ReciBot.py sin navegador usando la API de pruebas de Streamlit (AppTest) y simula
+varias sesiones concurrentes que recorren los flujos reales de la aplicación:
+
+- Recorrer el árbol de preguntas del "Formulario de clasificación".
+- Enviar el formulario de "Ingresar basura para estadística".
+- Cambiar los filtros de "mostrar basura" sobre un CSV sembrado con datos sintéticos.
+
+Modelo de procesos: cada sesión corre en su propio proceso, con su propia copia del CSV sembrado.
+AppTest no se puede usar desde varios hilos a la vez, porque cada rerun reemplaza el Runtime global
+de Streamlit y parchea la configuración global (los resultados salen vacíos o mezclados de forma
+intermitente); además crea una caché de st.cache_data nueva en cada rerun. Por eso este arnés NO
+reproduce un servidor `streamlit run`, que atiende todas las sesiones en hilos de un solo proceso
+con GIL, caché y memoria compartidos:
+
+- Por defecto todos los procesos se fijan a un mismo núcleo para aproximar el GIL compartido del
+  servidor; con --todos-los-nucleos el throughput sale sobreestimado en máquinas multinúcleo.
+- Los aciertos de caché quedan subestimados (AppTest no conserva la caché entre reruns).
+- La memoria se reporta por sesión: cada proceso carga su propio intérprete y librerías, así que
+  sumarlas no da la memoria de un servidor real.
+- Las carreras al escribir un CSV compartido no se miden aquí; dentro de un proceso servidor las
+  evita estadisticas_aproximadas.CANDADO_ESCRITURA.
+
+Al final reporta los percentiles de latencia por sección, los reruns por segundo y el crecimiento
+de memoria (RSS) por sesión. El primer rerun de cada sesión (arranque en frío, incluye importar
+las librerías) se reporta aparte y no cuenta para la compuerta. Las excepciones de la app se
+listan por mensaje.
+
+Si se indica --max-p95-ms, termina con código 1 cuando alguna sección lo supera o cuando hubo
+excepciones, para poder usarlo como compuerta antes de desplegar. Todo corre en una sola máquina
+Linux y sin red.
+"""
+
+import argparse                   # Lectura de parámetros de línea de comandos
+import os                         # Directorios de trabajo y rutas
+import multiprocessing            # Un proceso por sesión simulada
+import random                     # Elección de respuestas y filtros para cada sesión simulada
+import shutil                     # Copia del CSV sembrado para cada sesión
+import sys                        # Código de salida para la compuerta de despliegue
+import tempfile                   # Carpeta aislada para el CSV sembrado
+import threading                  # Excepción de barrera rota
+import time                       # Medición de latencias
+import traceback                  # Detalle de fallos del propio arnés
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+import numpy as np                # Percentiles de latencia
+import pandas as pd               # Generación del CSV sembrado
+from streamlit.testing.v1 import AppTest
+
+
+#----------------------------------------------------------------------------------------------------------------------------------------
+#-------------------------------------------------Constantes de la prueba---------------------------------------------------------------
+#----------------------------------------------------------------------------------------------------------------------------------------
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RUTA_APP = os.path.join(BASE_DIR, "ReciBot.py")
+RUTA_CSV = "datos_basura.csv"     # Misma ruta relativa que usa ReciBot.py
+
+SECCION_FORMULARIO = "Formulario de clasificación"
+SECCION_INGRESO = "Ingresar basura para estadística"
+SECCION_ANALISIS = "mostrar basura"
+SECCION_ARRANQUE = "Arranque en frío"
+
+FILTROS_ANALISIS = ["🔍 Buscar por usuario", "📅 Buscar por fecha"]
+ETIQUETA_GRANULARIDAD = "Granularidad"
+ETIQUETA_APROXIMADAS = "⚡ Mostrar estadísticas aproximadas del historial completo"
+ETIQUETA_TIPO_RESIDUO = "Tipo de residuo"
+
+TIPOS = ["organico", "plastico", "papel", "vidrio", "metal", "no_reciclable"]
+
+
+# -------------------------Función 1: sembrar un CSV con registros sintéticos------------------------------------------------------------
+def sembrar_datos(ruta_csv: str, registros: int, usuarios: int, semilla: int,
+                  fraccion_retroactiva: float = 0.1) -> None:
+    """
+    Crea un CSV con el mismo esquema y los mismos valores que genera guardar_datos_en_csv para que
+    la sección "mostrar basura" trabaje sobre un volumen de datos realista. Como en la app, cada
+    fila guarda los kg ingresados en Kg_<tipo>. La mayoría de las filas se guardaron el mismo día
+    de su fecha, así que Semanal/Mensual/Anual valen esos kg y Bolsas kg/3. Una fracción se ingresó
+    hoy con una fecha pasada: sus periodos valen los kg o 0 según si la fecha cae en la semana, el
+    mes o el año actual (ver procesar_datos_basura).
+
+    Parámetros:
+    - ruta_csv (str): Ruta del archivo CSV a crear.
+    - registros (int): Número de filas a generar.
+    - usuarios (int): Número de usuarios distintos.
+    - semilla (int): Semilla del generador aleatorio para resultados reproducibles.
+    - fraccion_retroactiva (float): Proporción de filas ingresadas hoy con una fecha pasada.
+    """
+    if registros <= 0:
+        return
+
+    rng = np.random.default_rng(semilla)
+    hoy = pd.Timestamp(date.today())
+    fechas = hoy - pd.to_timedelta(rng.integers(0, 3 * 365, size=registros), unit="D")
+    kg = rng.gamma(2.0, 1.5, size=(registros, len(TIPOS))).round(1)
+
+    # Las filas guardadas el día de su fecha cuentan en todos sus periodos
+    al_dia = rng.random(registros) >= fraccion_retroactiva
+    iso, iso_hoy = fechas.isocalendar(), hoy.isocalendar()
+    en_periodo = {
+        "Semanal": al_dia | ((iso["year"] == iso_hoy[0]) & (iso["week"] == iso_hoy[1])).to_numpy(),
+        "Mensual": al_dia | ((fechas.year == hoy.year) & (fechas.month == hoy.month)),
+        "Anual": al_dia | (fechas.year == hoy.year),
+    }
+
+    columnas = {
+        "Usuario": [f"usuario_{i}" for i in rng.integers(0, usuarios, size=registros)],
+        "Fecha": fechas.strftime("%Y-%m-%d"),
+    }
+    for j, tipo in enumerate(TIPOS):
+        columnas[f"Kg_{tipo}"] = kg[:, j]
+    for j, tipo in enumerate(TIPOS):
+        columnas[f"Bolsas_{tipo}"] = np.where(en_periodo["Semanal"], kg[:, j] / 3.0, 0.0).round(2)
+    for periodo, mascara in en_periodo.items():
+        for j, tipo in enumerate(TIPOS):
+            columnas[f"{periodo}_{tipo}"] = np.where(mascara, kg[:, j], 0.0)
+
+    pd.DataFrame(columnas).to_csv(ruta_csv, index=False)
+
+
+# -------------------------Función 2: ejecutar un rerun midiendo su latencia-------------------------------------------------------------
+def medir_rerun(at: AppTest, seccion: str, resultados: dict, timeout: float) -> None:
+    """
+    Ejecuta un rerun de la app y guarda su duración en milisegundos bajo la sección indicada.
+    Las excepciones de la app se registran por mensaje en lugar de detener la prueba.
+    """
+    inicio = time.perf_counter()
+    at.run(timeout=timeout)
+    duracion = (time.perf_counter() - inicio) * 1000
+
+    resultados["latencias"][seccion].append(duracion)
+    for excepcion in at.exception:
+        resultados["errores"][seccion] += 1
+        resultados["mensajes"][excepcion.message.splitlines()[0][:120]] += 1
+
+
+# -------------------------Función 3: flujos simulados por sección-----------------------------------------------------------------------
+def flujo_formulario(at: AppTest, rng: random.Random, medir) -> None:
+    """
+    Recorre el árbol de preguntas eligiendo respuestas al azar hasta que no aparezcan preguntas nuevas.
+    """
+    at.sidebar.selectbox[0].select(SECCION_FORMULARIO)
+    medir(SECCION_FORMULARIO)
+
+    i = 0
+    while i < len(at.radio):
+        radio = at.radio[i]
+        radio.set_value(rng.choice(list(radio.options)))
+        medir(SECCION_FORMULARIO)
+        i += 1
+
+
+def flujo_ingreso(at: AppTest, rng: random.Random, medir, id_sesion: int) -> None:
+    """
+    Llena el formulario de estadística con cantidades aleatorias y presiona "Guardar información".
+    """
+    at.sidebar.selectbox[0].select(SECCION_INGRESO)
+    medir(SECCION_INGRESO)
+
+    at.text_input[0].input(f"carga_{id_sesion}")
+    at.date_input[0].set_value(date.today() - timedelta(days=rng.randint(0, 365)))
+    for campo in at.number_input:
+        campo.set_value(round(rng.uniform(0, 5), 1))
+    at.button[0].click()
+    medir(SECCION_INGRESO)
+
+
+def flujo_analisis(at: AppTest, rng: random.Random, medir, cambios: int) -> None:
+    """
+    Abre "mostrar basura", cambia varias veces los filtros de usuario y fecha y la granularidad de
+    la tendencia, y pasa por las estadísticas aproximadas cambiando el tipo de residuo.
+    """
+    at.sidebar.selectbox[0].select(SECCION_ANALISIS)
+    medir(SECCION_ANALISIS)
+
+    for _ in range(cambios):
+        filtros = [s for s in at.main.selectbox if s.label in FILTROS_ANALISIS]
+        if not filtros:
+            break  # No hay datos almacenados, no hay filtros que cambiar
+        filtro = rng.choice(filtros)
+        filtro.select(rng.choice(list(filtro.options)))
+        medir(SECCION_ANALISIS)
+
+    for radio in [r for r in at.radio if r.label == ETIQUETA_GRANULARIDAD]:
+        radio.set_value(rng.choice(list(radio.options)))
+        medir(SECCION_ANALISIS)
+
+    # Cada rerun reconstruye los elementos, por eso se vuelven a buscar después de medir
+    casillas = [c for c in at.checkbox if c.label == ETIQUETA_APROXIMADAS]
+    if not casillas:
+        return  # Sin CSV todavía
+    casillas[0].check()
+    medir(SECCION_ANALISIS)
+    for tipo in [s for s in at.main.selectbox if s.label == ETIQUETA_TIPO_RESIDUO]:
+        tipo.select(rng.choice(list(tipo.options)))
+        medir(SECCION_ANALISIS)
+    for casilla in [c for c in at.checkbox if c.label == ETIQUETA_APROXIMADAS]:
+        casilla.uncheck()
+        medir(SECCION_ANALISIS)
+
+
+# -------------------------Función 4: una sesión completa de usuario---------------------------------------------------------------------
+_barrera = None  # Barrera compartida por los procesos de sesión (se asigna en _inicializar_proceso)
+
+
+def _inicializar_proceso(barrera, un_nucleo: bool) -> None:
+    """
+    Prepara cada proceso de sesión: guarda la barrera de inicio y, si se pide, fija el proceso al
+    primer núcleo disponible para que todas las sesiones compitan por una sola CPU.
+    """
+    global _barrera
+    _barrera = barrera
+    if un_nucleo and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+
+def ejecutar_sesion(id_sesion: int, args: argparse.Namespace, directorio: str) -> dict:
+    """
+    Simula una sesión independiente de navegador que repite los tres flujos varias veces.
+    Se ejecuta en un proceso hijo, dentro de su propio directorio con una copia del CSV sembrado.
+    Todas las sesiones esperan en la barrera a que terminen los arranques en frío antes de medir.
+
+    Retorna:
+    - dict: Latencias, errores y mensajes de excepción por sección, fallos del propio arnés,
+      memoria RSS (KiB) tras el arranque y al final, e instantes de inicio y fin de la medición.
+    """
+    os.chdir(directorio)
+    resultados = {"latencias": defaultdict(list), "errores": defaultdict(int),
+                  "mensajes": Counter(), "fallos_arnes": []}
+    rng = random.Random(args.semilla + id_sesion)
+    at = AppTest.from_file(RUTA_APP, default_timeout=args.timeout)
+    medir = lambda seccion: medir_rerun(at, seccion, resultados, args.timeout)
+
+    try:
+        medir(SECCION_ARRANQUE)
+        _barrera.wait()
+        resultados["rss_inicial"] = leer_rss_kib()
+        resultados["inicio"] = time.time()
+
+        for _ in range(args.iteraciones):
+            flujo_formulario(at, rng, medir)
+            flujo_ingreso(at, rng, medir, id_sesion)
+            flujo_analisis(at, rng, medir, args.cambios_filtro)
+    except (Exception, threading.BrokenBarrierError):
+        _barrera.abort()  # Si una sesión falla antes de la barrera, las demás no se quedan esperando
+        resultados["fallos_arnes"].append(traceback.format_exc())
+
+    resultados.setdefault("rss_inicial", leer_rss_kib())
+    resultados.setdefault("inicio", time.time())
+    resultados["rss_final"] = leer_rss_kib()
+    resultados["fin"] = time.time()
+    return resultados
+
+
+# -------------------------Función 5: resumen de resultados------------------------------------------------------------------------------
+def imprimir_reporte(sesiones: list) -> dict:
+    """
+    Combina los resultados de todas las sesiones e imprime percentiles de latencia por sección,
+    throughput, crecimiento de memoria por sesión y excepciones de la app.
+
+    Retorna:
+    - dict: Percentil 95 (ms) por sección medida (sin el arranque en frío), usado por la compuerta.
+    """
+    latencias_por_seccion = defaultdict(list)
+    errores_por_seccion = defaultdict(int)
+    mensajes = Counter()
+    for resultados in sesiones:
+        for seccion, latencias in resultados["latencias"].items():
+            latencias_por_seccion[seccion].extend(latencias)
+        for seccion, errores in resultados["errores"].items():
+            errores_por_seccion[seccion] += errores
+        mensajes.update(resultados["mensajes"])
+
+    print(f"\n{'Sección':<36}{'reruns':>8}{'errores':>9}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+    print("-" * 103)
+
+    def imprimir_fila(seccion: str) -> float:
+        latencias = latencias_por_seccion[seccion]
+        p50, p90, p95, p99 = np.percentile(latencias, [50, 90, 95, 99])
+        print(f"{seccion:<36}{len(latencias):>8}{errores_por_seccion[seccion]:>9}"
+              f"{p50:>10.1f}{p90:>10.1f}{p95:>10.1f}{p99:>10.1f}{max(latencias):>10.1f}")
+        return p95
+
+    medidas = [seccion for seccion in latencias_por_seccion if seccion != SECCION_ARRANQUE]
+    p95_por_seccion = {seccion: imprimir_fila(seccion) for seccion in medidas}
+    total_reruns = sum(len(latencias_por_seccion[seccion]) for seccion in medidas)
+    print("-" * 103)
+    if latencias_por_seccion[SECCION_ARRANQUE]:
+        imprimir_fila(SECCION_ARRANQUE)
+        print("-" * 103)
+    print("(El arranque en frío se mide una vez por sesión y no cuenta para la compuerta.)")
+    duracion = max(r["fin"] for r in sesiones) - min(r["inicio"] for r in sesiones)
+    print(f"Reruns medidos: {total_reruns} en {duracion:.1f} s ({total_reruns / duracion:.1f} reruns/s)")
+
+    crecimientos = [(r["rss_final"] - r["rss_inicial"]) / 1024 for r in sesiones]
+    print(f"Memoria RSS por sesión: {np.mean([r['rss_inicial'] for r in sesiones]) / 1024:.1f} MiB tras el "
+          f"arranque; crecimiento medio {np.mean(crecimientos):+.1f} MiB, máx {max(crecimientos):+.1f} MiB")
+
+    if mensajes:
+        print("\nExcepciones de la app, por mensaje:")
+        for mensaje, veces in mensajes.most_common():
+            print(f"  {veces:>5} × {mensaje}")
+
+    return p95_por_seccion
+
+
+def leer_rss_kib() -> int:
+    """
+    Lee la memoria residente actual del proceso (KiB) desde /proc. Retorna 0 fuera de Linux.
+    """
+    try:
+        with open("/proc/self/status") as archivo:
+            for linea in archivo:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+#----------------------------------------------------------------------------------------------------------------------------------------
+#----------------------------------------------------------Programa principal------------------------------------------------------------
+#----------------------------------------------------------------------------------------------------------------------------------------
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de ReciBot con sesiones concurrentes.")
+    parser.add_argument("--sesiones", type=int, default=4, help="Sesiones concurrentes simuladas.")
+    parser.add_argument("--iteraciones", type=int, default=3, help="Veces que cada sesión repite los flujos.")
+    parser.add_argument("--cambios-filtro", type=int, default=5, help="Cambios de filtro por visita a 'mostrar basura'.")
+    parser.add_argument("--registros", type=int, default=2000, help="Filas sembradas en el CSV antes de empezar.")
+    parser.add_argument("--fraccion-retroactiva", type=float, default=0.1,
+                        help="Proporción de filas sembradas como ingresadas hoy con una fecha pasada.")
+    parser.add_argument("--usuarios", type=int, default=50, help="Usuarios distintos en los datos sembrados.")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla para datos y recorridos reproducibles.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Tiempo máximo (s) por rerun.")
+    parser.add_argument("--todos-los-nucleos", action="store_true",
+                        help="No fijar las sesiones a un solo núcleo (sobreestima el throughput de un servidor).")
+    parser.add_argument("--max-p95-ms", type=float, default=None,
+                        help="Si se indica, falla cuando el p95 de alguna sección supera este valor.")
+    args = parser.parse_args()
+
+    # ReciBot.py guarda y lee el CSV relativo al directorio actual: cada sesión trabaja en su propia
+    # carpeta con una copia de los datos sembrados, así ninguna lee el CSV mientras otra lo escribe
+    with tempfile.TemporaryDirectory(prefix="recibot_carga_") as carpeta:
+        ruta_semilla = os.path.join(carpeta, RUTA_CSV)
+        sembrar_datos(ruta_semilla, args.registros, args.usuarios, args.semilla, args.fraccion_retroactiva)
+        directorios = []
+        for i in range(args.sesiones):
+            directorio = os.path.join(carpeta, f"sesion_{i}")
+            os.mkdir(directorio)
+            if os.path.exists(ruta_semilla):
+                shutil.copy(ruta_semilla, directorio)
+            directorios.append(directorio)
+
+        # Pool arranca todos los procesos de una vez: cada sesión ocupa un proceso hasta terminar
+        barrera = multiprocessing.Barrier(args.sesiones)
+        with multiprocessing.Pool(args.sesiones, initializer=_inicializar_proceso,
+                                  initargs=(barrera, not args.todos_los_nucleos)) as pool:
+            sesiones = pool.starmap(ejecutar_sesion, [(i, args, d) for i, d in enumerate(directorios)])
+
+    p95_por_seccion = imprimir_reporte(sesiones)
+
+    fallos_arnes = [fallo for r in sesiones for fallo in r["fallos_arnes"]]
+    for fallo in fallos_arnes:
+        print(f"\n⚠️ Una sesión se detuvo por un fallo del arnés:\n{fallo}")
+
+    total_errores = sum(sum(r["errores"].values()) for r in sesiones)
+    if args.max_p95_ms is not None:
+        lentas = [s for s, p95 in p95_por_seccion.items() if p95 > args.max_p95_ms]
+        if lentas or total_errores or fallos_arnes:
+            print(f"\n❌ Compuerta fallida: secciones lentas={lentas}, excepciones={total_errores}, "
+                  f"fallos del arnés={len(fallos_arnes)}")
+            return 1
+        print(f"\n✅ Compuerta superada: todas las secciones con p95 <= {args.max_p95_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
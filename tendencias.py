@@ -0,0 +1,121 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# Descripción: Series de tendencia de ReciBot (kg por tipo de residuo a lo largo del tiempo)
+#----------------------------------------------------------------------------------------------------------------------------------------
+"""
+Series de tiempo de kg por tipo de residuo para la vista "mostrar basura".
+
+Las series se calculan leyendo el CSV por bloques y solo con las columnas necesarias, se reducen a
+un número máximo de puntos y se guardan en la caché de Streamlit con la versión del CSV
+(fecha de modificación y tamaño) como parte de la clave.
+"""
+
+import numpy as np                # Asignación de periodos a bloques al reducir puntos
+import pandas as pd               # Lectura por bloques y remuestreo de series de tiempo
+import streamlit as st            # Caché de resultados entre reruns y sesiones
+
+import estadisticas_aproximadas as ea  # Kg por registro (incluye filas antiguas sin columnas Kg_)
+
+
+# Reglas de remuestreo de pandas para cada granularidad (las semanas empiezan en lunes)
+REGLAS_REMUESTREO = {
+    "Diaria": "D",
+    "Semanal": "W-MON",
+    "Mensual": "MS",
+}
+
+# Columnas del CSV que intervienen en las series (los periodos solo se usan en filas antiguas)
+_PREFIJOS_KG = ("Kg_", "Semanal_", "Mensual_", "Anual_")
+
+
+def obtener_series_tendencia(df: pd.DataFrame, granularidad: str) -> pd.DataFrame:
+    """
+    Construye series de tiempo de kg por tipo de residuo a partir de la fecha y los kg ingresados en
+    cada registro (columnas Kg_<tipo>; ver ea.kg_de_registros para filas antiguas), sumando los
+    registros de cada día, semana o mes con un remuestreo vectorizado.
+
+    Parámetros:
+    - df (pd.DataFrame): DataFrame con los registros almacenados.
+    - granularidad (str): "Diaria", "Semanal" o "Mensual".
+
+    Retorna:
+    - pd.DataFrame: Una columna por tipo de residuo, indexada por el inicio de cada periodo.
+    """
+    kg = ea.kg_de_registros(df)
+    kg.index = pd.to_datetime(df["Fecha"])
+    return kg.sort_index().resample(REGLAS_REMUESTREO[granularidad], label="left", closed="left").sum()
+
+
+def reducir_puntos(series: pd.DataFrame, max_puntos: int = 300) -> pd.DataFrame:
+    """
+    Reduce una serie larga a un máximo de puntos promediando bloques consecutivos de periodos,
+    para que graficar varios años cueste lo mismo sin importar cuántos periodos haya.
+
+    Parámetros:
+    - series (pd.DataFrame): Series de tiempo indexadas por fecha.
+    - max_puntos (int): Número máximo de puntos a conservar.
+
+    Retorna:
+    - pd.DataFrame: Series con a lo sumo max_puntos filas, indexadas por el inicio de cada bloque.
+    """
+    if len(series) <= max_puntos:
+        return series
+
+    tamano_bloque = int(np.ceil(len(series) / max_puntos))
+    bloques = np.arange(len(series)) // tamano_bloque
+    reducidas = series.groupby(bloques).mean()
+    reducidas.index = series.index[::tamano_bloque]
+    return reducidas
+
+
+def series_tendencia_desde_csv(ruta_csv: str, usuario: str, granularidad: str,
+                               filas_por_bloque: int = 50_000) -> pd.DataFrame:
+    """
+    Calcula las series de tendencia leyendo el CSV por bloques, así la memoria depende del número
+    de periodos y no del número de registros.
+
+    Parámetros:
+    - ruta_csv (str): Ruta del CSV con los registros.
+    - usuario (str): Filtro de usuario, igual que en filtrar_datos (vacío para toda la comunidad).
+    - granularidad (str): "Diaria", "Semanal" o "Mensual".
+    - filas_por_bloque (int): Registros leídos por bloque.
+
+    Retorna:
+    - pd.DataFrame: Una columna por tipo de residuo, o vacío si ningún registro coincide.
+    """
+    partes = []
+    columnas = lambda col: col in ("Usuario", "Fecha") or col.startswith(_PREFIJOS_KG)
+    for bloque in pd.read_csv(ruta_csv, usecols=columnas, chunksize=filas_por_bloque):
+        if usuario:
+            bloque = bloque[bloque["Usuario"].astype(str).str.contains(usuario, case=False)]
+        if not bloque.empty:
+            partes.append(obtener_series_tendencia(bloque, granularidad))
+    if not partes:
+        return pd.DataFrame()
+
+    # Un mismo periodo puede repartirse entre bloques; se suman y se rellenan los huecos entre bloques
+    series = pd.concat(partes).groupby(level=0).sum()
+    return series.resample(REGLAS_REMUESTREO[granularidad], label="left", closed="left").sum()
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def obtener_series_tendencia_cacheadas(ruta_csv: str, usuario: str, granularidad: str,
+                                       version_datos: tuple, max_puntos: int = 300) -> pd.DataFrame:
+    """
+    Calcula y reduce las series de tendencia. Streamlit guarda el resultado en caché para cada
+    combinación de argumentos; version_datos (fecha de modificación y tamaño del CSV) hace que la
+    caché se invalide sola cuando se guarda un registro nuevo.
+
+    Parámetros:
+    - ruta_csv (str): Ruta del CSV con los registros.
+    - usuario (str): Filtro de usuario (vacío para toda la comunidad).
+    - granularidad (str): "Diaria", "Semanal" o "Mensual".
+    - version_datos (tuple): Versión de los datos; solo se usa como parte de la clave de caché.
+    - max_puntos (int): Número máximo de puntos a graficar.
+
+    Retorna:
+    - pd.DataFrame: Series listas para graficar.
+    """
+    series = series_tendencia_desde_csv(ruta_csv, usuario, granularidad)
+    if series.empty:
+        return series
+    return reducir_puntos(series, max_puntos)
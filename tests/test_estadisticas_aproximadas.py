@@ -0,0 +1,253 @@
+import json
+import os
+import random
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import estadisticas_aproximadas as ea
+
+
+RUTA_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ReciBot.py")
+
+
+def ida_y_vuelta(sketch):
+    """Serializa a JSON y reconstruye, como hace el resumen guardado en disco."""
+    return type(sketch).desde_dict(json.loads(json.dumps(sketch.a_dict())))
+
+
+def rango_real(valores_ordenados, valor):
+    return np.searchsorted(valores_ordenados, valor, side="right") / len(valores_ordenados)
+
+
+# ----------------------------------------------ConteoDistintos (HyperLogLog)-------------------------------------------
+
+@pytest.mark.parametrize("distintos", [10, 1_000, 50_000])
+def test_conteo_distintos_estima_con_error_acotado(distintos):
+    sketch = ea.ConteoDistintos()
+    for i in range(distintos):
+        sketch.agregar(f"usuario_{i}")
+        sketch.agregar(f"usuario_{i}")  # Los repetidos no cuentan
+    assert abs(sketch.estimar() - distintos) <= max(1, 0.05 * distintos)
+
+
+def test_conteo_distintos_combinar_equivale_a_un_solo_flujo():
+    completo, parte_a, parte_b = ea.ConteoDistintos(), ea.ConteoDistintos(), ea.ConteoDistintos()
+    for i in range(20_000):
+        completo.agregar(i)
+        (parte_a if i % 3 else parte_b).agregar(i)
+    parte_a.combinar(parte_b)
+    assert parte_a.registros == completo.registros
+
+
+def test_conteo_distintos_ida_y_vuelta():
+    sketch = ea.ConteoDistintos()
+    for i in range(500):
+        sketch.agregar(i)
+    copia = ida_y_vuelta(sketch)
+    assert copia.registros == sketch.registros
+    assert copia.estimar() == sketch.estimar()
+
+
+# ----------------------------------------------CuantilesKLL-----------------------------------------------------------
+
+def test_cuantiles_kll_error_de_rango_acotado():
+    rng = random.Random(0)
+    valores = [rng.expovariate(0.2) for _ in range(100_000)]
+    sketch = ea.CuantilesKLL()
+    for valor in valores:
+        sketch.agregar(valor)
+
+    ordenados = np.sort(valores)
+    for q in [0.01, 0.25, 0.5, 0.75, 0.99]:
+        assert abs(rango_real(ordenados, sketch.cuantil(q)) - q) <= 0.02
+    assert sketch.conteo == len(valores)
+
+
+def test_cuantiles_kll_pocos_valores_son_exactos():
+    sketch = ea.CuantilesKLL()
+    for valor in [3.0, 5.0, 7.0]:
+        sketch.agregar(valor)
+    assert [sketch.cuantil(q) for q in [0.0, 0.5, 1.0]] == [3.0, 5.0, 7.0]
+    assert ea.CuantilesKLL().cuantil(0.5) is None
+
+
+def test_cuantiles_kll_combinar_equivale_a_un_solo_flujo():
+    rng = random.Random(1)
+    valores = [rng.uniform(0, 100) for _ in range(60_000)]
+    partes = [ea.CuantilesKLL() for _ in range(4)]
+    for i, valor in enumerate(valores):
+        partes[i % 4].agregar(valor)
+    combinado = partes[0]
+    for parte in partes[1:]:
+        combinado.combinar(parte)
+
+    ordenados = np.sort(valores)
+    assert combinado.conteo == len(valores)
+    for q in [0.1, 0.5, 0.9]:
+        assert abs(rango_real(ordenados, combinado.cuantil(q)) - q) <= 0.02
+
+
+def test_cuantiles_kll_ida_y_vuelta():
+    sketch = ea.CuantilesKLL()
+    for i in range(5_000):
+        sketch.agregar(i)
+    copia = ida_y_vuelta(sketch)
+    assert copia.niveles == sketch.niveles
+    assert copia.conteo == sketch.conteo
+    assert copia.tamano == sketch.tamano and copia.tamano_maximo == sketch.tamano_maximo
+    assert copia.cuantil(0.5) == sketch.cuantil(0.5)
+    copia.agregar(1.0)  # Sigue siendo utilizable después de cargarse
+
+
+# ----------------------------------------------PrincipalesContribuyentes (Space-Saving)-------------------------------
+
+def pesos_reales(flujo):
+    reales = {}
+    for elemento, peso in flujo:
+        reales[elemento] = reales.get(elemento, 0.0) + peso
+    return reales
+
+
+def flujo_sesgado(semilla, n=20_000):
+    rng = random.Random(semilla)
+    return [(f"u{min(int(rng.paretovariate(1.2)), 500)}", rng.uniform(0.1, 5.0)) for _ in range(n)]
+
+
+def assert_cotas_validas(sketch, reales):
+    for elemento, (peso, error) in sketch.contadores.items():
+        assert peso - error - 1e-9 <= reales.get(elemento, 0.0) <= peso + 1e-9
+
+
+def test_principales_detecta_mayores_con_cotas_validas():
+    flujo = flujo_sesgado(0)
+    sketch = ea.PrincipalesContribuyentes(k=30)
+    for elemento, peso in flujo:
+        sketch.agregar(elemento, peso)
+
+    reales = pesos_reales(flujo)
+    assert_cotas_validas(sketch, reales)
+    mayores_reales = sorted(reales, key=reales.get, reverse=True)[:3]
+    assert [e for e, _, _ in sketch.principales(3)] == mayores_reales
+
+
+def test_principales_combinar_conserva_cotas():
+    # Un elemento que falta en uno de los resúmenes recibe el mínimo de ese resumen como peso y error
+    a, b = ea.PrincipalesContribuyentes(k=1), ea.PrincipalesContribuyentes(k=1)
+    a.agregar("a", 10)
+    b.agregar("a", 3)
+    b.agregar("b", 5)
+    a.combinar(b)
+    assert_cotas_validas(a, {"a": 13, "b": 5})
+
+
+def test_principales_combinar_equivale_a_un_solo_flujo():
+    flujo = flujo_sesgado(1)
+    completo = ea.PrincipalesContribuyentes(k=30)
+    partes = [ea.PrincipalesContribuyentes(k=30) for _ in range(3)]
+    for i, (elemento, peso) in enumerate(flujo):
+        completo.agregar(elemento, peso)
+        partes[i % 3].agregar(elemento, peso)
+    combinado = partes[0]
+    for parte in partes[1:]:
+        combinado.combinar(parte)
+
+    assert len(combinado.contadores) <= combinado.k
+    assert_cotas_validas(combinado, pesos_reales(flujo))
+    assert [e for e, _, _ in combinado.principales(3)] == [e for e, _, _ in completo.principales(3)]
+
+
+def test_principales_ida_y_vuelta():
+    sketch = ea.PrincipalesContribuyentes(k=5)
+    for elemento, peso in flujo_sesgado(2, n=200):
+        sketch.agregar(elemento, peso)
+    copia = ida_y_vuelta(sketch)
+    assert copia.k == sketch.k
+    assert copia.contadores == sketch.contadores
+
+
+# ----------------------------------------------Resumen en disco-------------------------------------------------------
+
+def test_kg_de_registros_usa_kg_guardados_y_periodos_en_filas_antiguas():
+    df = pd.DataFrame({
+        "Usuario": ["nueva", "antigua", "antigua_otro_anio"],
+        "Semanal_papel": [0.0, 2.0, 0.0],
+        "Mensual_papel": [0.0, 2.0, 0.0],
+        "Anual_papel": [0.0, 2.0, 0.0],
+        "Kg_papel": [7.0, np.nan, np.nan],
+    })
+    assert ea.kg_de_registros(df)["papel"].tolist() == [7.0, 2.0, 0.0]
+
+
+def test_resumen_danado_se_reconstruye(tmp_path):
+    ruta_csv = str(tmp_path / "datos_basura.csv")
+    pd.DataFrame({"Usuario": ["ana"], "Fecha": ["2024-01-01"], "Kg_papel": [2.0]}).to_csv(ruta_csv, index=False)
+    with open(ea.ruta_resumen(ruta_csv), "w") as archivo:
+        archivo.write('{"version_csv": [1, ')  # JSON truncado
+
+    ea.actualizar_resumen(ruta_csv, "ana", {"papel": 1.0}, ea.version_csv(ruta_csv))
+    assert not os.path.exists(ea.ruta_resumen(ruta_csv))
+    assert ea.cargar_resumen(ruta_csv).registros == 1
+    assert os.path.exists(ea.ruta_resumen(ruta_csv))
+
+
+def test_reconstruccion_igual_a_actualizacion_incremental(tmp_path, monkeypatch):
+    """Guarda registros desde la app (con fechas de otros años) y compara ambos caminos."""
+    apptest = pytest.importorskip("streamlit.testing.v1")
+    monkeypatch.chdir(tmp_path)
+
+    registros = [
+        ("ana", date.today(), 5.0),
+        ("beto", date(2024, 3, 4), 7.0),
+        ("carla", date(2025, 12, 30), 3.0),
+        ("ana", date(2023, 6, 1), 1.5),
+    ]
+    at = apptest.AppTest.from_file(RUTA_APP, default_timeout=60).run()
+    at.sidebar.selectbox[0].select("Ingresar basura para estadística").run()
+    for i, (usuario, fecha, kg) in enumerate(registros):
+        at.text_input[0].input(usuario)
+        at.date_input[0].set_value(fecha)
+        at.number_input[0].set_value(kg)                       # Orgánica
+        at.number_input[2].set_value(float(i))                 # Papel y cartón
+        at.button[0].click().run()
+        assert not at.exception
+        if i == 0:
+            ea.cargar_resumen("datos_basura.csv")  # Primer resumen; después solo hay actualizaciones incrementales
+
+    incremental = ea._leer_resumen_guardado("datos_basura.csv")
+    assert incremental is not None and incremental[0] == ea.version_csv("datos_basura.csv")
+    incremental = incremental[1]
+    reconstruido = ea.construir_resumen("datos_basura.csv")
+
+    assert incremental.registros == reconstruido.registros == len(registros)
+    assert incremental.usuarios.registros == reconstruido.usuarios.registros
+    assert sorted(incremental.kg_por_registro.niveles[0]) == sorted(reconstruido.kg_por_registro.niveles[0])
+    assert sorted(reconstruido.kg_por_registro.niveles[0]) == [4.5, 5.0, 5.0, 8.0]
+    for tipo in ea.TIPOS:
+        # La reconstrucción suma los kg por usuario en cada bloque; solo cambia el orden de las sumas
+        contadores = incremental.principales_por_tipo[tipo].contadores
+        assert contadores.keys() == reconstruido.principales_por_tipo[tipo].contadores.keys()
+        for usuario, (peso, error) in reconstruido.principales_por_tipo[tipo].contadores.items():
+            assert contadores[usuario] == pytest.approx([peso, error])
+
+
+def test_reconstruccion_no_se_guarda_si_el_csv_cambio(tmp_path, monkeypatch):
+    ruta_csv = str(tmp_path / "datos_basura.csv")
+    pd.DataFrame({"Usuario": ["ana"], "Fecha": ["2024-01-01"], "Kg_papel": [2.0]}).to_csv(ruta_csv, index=False)
+    construir = ea.construir_resumen
+
+    def construir_mientras_se_guarda(ruta):
+        resumen = construir(ruta)
+        with open(ruta, "a") as archivo:
+            archivo.write("beto,2024-01-02,1.0\n")
+        return resumen
+
+    monkeypatch.setattr(ea, "construir_resumen", construir_mientras_se_guarda)
+    assert ea.cargar_resumen(ruta_csv).registros == 1
+    assert not os.path.exists(ea.ruta_resumen(ruta_csv))
+
+    monkeypatch.setattr(ea, "construir_resumen", construir)
+    assert ea.cargar_resumen(ruta_csv).registros == 2
+    assert ea._leer_resumen_guardado(ruta_csv)[0] == ea.version_csv(ruta_csv)
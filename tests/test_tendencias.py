@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import estadisticas_aproximadas as ea
+import tendencias
+
+
+def registros(*filas):
+    """Filas (usuario, fecha, kg orgánicos) con el mismo esquema que guarda la app."""
+    return pd.DataFrame({
+        "Usuario": [usuario for usuario, _, _ in filas],
+        "Fecha": [fecha for _, fecha, _ in filas],
+        "Kg_organico": [kg for _, _, kg in filas],
+        "Kg_papel": [0.0] * len(filas),
+    })
+
+
+def test_semanas_empiezan_en_lunes():
+    df = registros(("ana", "2025-03-02", 1.0), ("ana", "2025-03-03", 2.0), ("ana", "2025-03-09", 4.0))  # Dom, Lun, Dom
+    series = tendencias.obtener_series_tendencia(df, "Semanal")
+    assert series.index.tolist() == [pd.Timestamp("2025-02-24"), pd.Timestamp("2025-03-03")]
+    assert series["organico"].tolist() == [1.0, 6.0]
+
+
+def test_meses_empiezan_el_dia_uno():
+    df = registros(("ana", "2025-01-31", 1.0), ("ana", "2025-02-01", 2.0), ("ana", "2025-04-15", 3.0))
+    series = tendencias.obtener_series_tendencia(df, "Mensual")
+    assert series.index.tolist() == list(pd.date_range("2025-01-01", "2025-04-01", freq="MS"))
+    assert series["organico"].tolist() == [1.0, 2.0, 0.0, 3.0]  # Marzo sin registros vale 0
+
+
+def test_reducir_puntos_promedia_bloques_alineados():
+    series = pd.DataFrame({"organico": np.arange(1_000, dtype=float)},
+                          index=pd.date_range("2020-01-01", periods=1_000, freq="D"))
+    reducidas = tendencias.reducir_puntos(series, max_puntos=300)
+
+    assert len(reducidas) <= 300
+    assert reducidas.index.tolist() == series.index[::4].tolist()  # Bloques de ceil(1000 / 300) = 4 días
+    assert reducidas["organico"].iloc[0] == pytest.approx(1.5)
+    assert reducidas["organico"].iloc[-1] == pytest.approx(997.5)
+    assert len(tendencias.reducir_puntos(series.iloc[:300], max_puntos=300)) == 300
+
+
+def test_lectura_por_bloques_igual_a_lectura_completa(tmp_path):
+    ruta_csv = str(tmp_path / "datos_basura.csv")
+    df = registros(("ana", "2025-01-06", 1.0), ("beto", "2025-01-07", 2.0), ("Ana", "2025-01-20", 3.0),
+                   ("ana", "2025-01-21", 4.0), ("carla", "2025-03-01", 5.0))
+    df.to_csv(ruta_csv, index=False)
+
+    for granularidad in tendencias.REGLAS_REMUESTREO:
+        por_bloques = tendencias.series_tendencia_desde_csv(ruta_csv, "", granularidad, filas_por_bloque=2)
+        pd.testing.assert_frame_equal(por_bloques, tendencias.obtener_series_tendencia(df, granularidad),
+                                      check_freq=False)
+
+    solo_ana = tendencias.series_tendencia_desde_csv(ruta_csv, "ana", "Mensual", filas_por_bloque=2)
+    assert solo_ana["organico"].tolist() == [8.0]  # Insensible a mayúsculas, como filtrar_datos
+    assert tendencias.series_tendencia_desde_csv(ruta_csv, "nadie", "Mensual").empty
+
+
+def test_cache_se_invalida_al_agregar_registro_con_la_misma_fecha_de_modificacion(tmp_path):
+    ruta_csv = str(tmp_path / "datos_basura.csv")
+    registros(("ana", "2025-01-06", 1.0)).to_csv(ruta_csv, index=False)
+    tendencias.obtener_series_tendencia_cacheadas.clear()
+
+    version_previa = ea.version_csv(ruta_csv)
+    antes = tendencias.obtener_series_tendencia_cacheadas(ruta_csv, "", "Mensual", tuple(version_previa))
+
+    # Un guardado dentro de la resolución del reloj del sistema de archivos deja igual mtime_ns
+    with open(ruta_csv, "a") as archivo:
+        archivo.write("beto,2025-01-07,2.0,0.0\n")
+    os.utime(ruta_csv, ns=(version_previa[0], version_previa[0]))
+    version = ea.version_csv(ruta_csv)
+    assert version[0] == version_previa[0] and version != version_previa
+
+    despues = tendencias.obtener_series_tendencia_cacheadas(ruta_csv, "", "Mensual", tuple(version))
+    assert antes["organico"].tolist() == [1.0]
+    assert despues["organico"].tolist() == [3.0]